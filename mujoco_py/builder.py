@@ -1,32 +1,128 @@
 import distutils
+import functools
+import hashlib
+import importlib.util
+import json
 import os
+import re
 import shutil
 import sys
+import sysconfig
+import tempfile
+from distutils import ccompiler
 from distutils.core import Extension
 from distutils.dist import Distribution
 from distutils.sysconfig import customize_compiler
-from os.path import abspath, dirname, exists, join, getmtime
-from random import choice
-from shutil import move
-from string import ascii_lowercase
+from os.path import abspath, dirname, exists, expanduser, join, getmtime
 from importlib.machinery import ExtensionFileLoader
+from multiprocessing.pool import ThreadPool
 import glob
 
-import numpy as np
-from cffi import FFI
-from Cython.Build import cythonize
-from Cython.Distutils.old_build_ext import old_build_ext as build_ext
 from mujoco_py.version import get_version
-from lockfile import LockFile
 import subprocess
 
 from mujoco_py.utils import discover_mujoco, MISSING_KEY_MESSAGE
 
 
+def get_cext_inputs(cymj_dir_path):
+    '''
+    Files covered by the cymj cache key: the sources compiled into the
+    extension, plus builder.py since it sets the compiler and linker flags.
+    '''
+    patterns = ['*.pyx', join('pxd', '*.pxd'), join('generated', '*.pxi'),
+                join('gl', '*.c'), join('gl', '*.h'), 'builder.py']
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(join(cymj_dir_path, pattern))))
+    return paths
+
+
+def get_cython_version():
+    '''
+    Returns the installed Cython version, or None if Cython isn't found.
+    Read from the distribution metadata rather than imported, as importing
+    Cython is comparatively slow and it's otherwise only needed for building.
+    '''
+    try:
+        import importlib.metadata
+    except ImportError:
+        pass  # Python < 3.8
+    else:
+        try:
+            return importlib.metadata.version('Cython')
+        except importlib.metadata.PackageNotFoundError:
+            pass
+    # Fall back to reading the version from Cython's sources
+    spec = importlib.util.find_spec('Cython')
+    if spec is None or spec.origin is None:
+        return None
+    try:
+        with open(join(dirname(spec.origin), 'Shadow.py')) as f:
+            match = re.search(r'^__version__\s*=\s*[\'"]([^\'"]+)[\'"]',
+                              f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def get_cext_hash(cymj_dir_path, mujoco_path, build_base):
+    '''
+    Returns a short hash of everything that affects the built cymj extension:
+    the Cython and C sources, the MuJoCo headers, the Cython version and the
+    Python ABI. The cached shared library is keyed on it, so that editing
+    the sources triggers a rebuild and unchanged sources never do.
+    '''
+    cython_version = get_cython_version()
+    sha = hashlib.sha256()
+    # Hash header contents rather than mtimes so that a library built
+    # elsewhere against the same MuJoCo release is still picked up.
+    mujoco_headers = sorted(glob.glob(join(mujoco_path, 'include', '*.h')))
+    for path in get_cext_inputs(cymj_dir_path) + mujoco_headers:
+        sha.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            sha.update(f.read())
+    meta = [
+        build_base,
+        str(cython_version),
+        str(sysconfig.get_config_var('EXT_SUFFIX')),
+        str(os.environ.get('MUJOCO_PY_OPENMP', '')),
+    ]
+    sha.update('\0'.join(meta).encode())
+    return sha.hexdigest()[:16]
+
+
+def uses_openmp(cymj_dir_path):
+    '''
+    Whether the cymj extension needs OpenMP, i.e. if its Cython sources
+    call `prange()`/`parallel()` or contain omp pragmas. Set the
+    MUJOCO_PY_OPENMP environment variable to always build with OpenMP.
+    '''
+    if os.environ.get('MUJOCO_PY_OPENMP'):
+        return True
+    pattern = re.compile(rb'\b(prange|parallel)\s*\(|#\s*pragma\s+omp')
+    for path in glob.glob(join(cymj_dir_path, '*.pyx')):
+        with open(path, 'rb') as f:
+            if pattern.search(f.read()):
+                return True
+    return False
+
+
+@functools.lru_cache(maxsize=1)
 def get_nvidia_lib_dir():
-    exists_nvidia_smi = subprocess.call("type nvidia-smi", shell=True,
-                                        stdout=subprocess.PIPE, stderr=subprocess.PIPE) == 0
-    if not exists_nvidia_smi:
+    '''
+    Returns the directory of the NVIDIA driver libraries, or None.
+
+    Set the MUJOCO_PY_NVIDIA_LIB environment variable to choose the directory
+    explicitly and skip the probe (empty if there is none).
+    '''
+    override = os.environ.get('MUJOCO_PY_NVIDIA_LIB')
+    if override is not None:
+        return override or None
+    return _find_nvidia_lib_dir()
+
+
+def _find_nvidia_lib_dir():
+    if shutil.which('nvidia-smi') is None:
         return None
     docker_path = '/usr/local/nvidia/lib64'
     if exists(docker_path):
@@ -81,36 +177,41 @@ The easy solution is to `import mujoco_py` _before_ `import glfw`.
     else:
         raise RuntimeError("Unsupported platform %s" % sys.platform)
 
+    # Fast path: if the library is already built there is no need to set up
+    # the extension or to wait on the build lock.
     builder = Builder(mujoco_path)
     cext_so_path = builder.get_so_file_path()
+    force_rebuild = os.environ.get('MUJOCO_PY_FORCE_REBUILD')
+    if not force_rebuild and exists(cext_so_path):
+        try:
+            return load_dynamic_ext('cymj', cext_so_path)
+        except ImportError:
+            print("Import error. Trying to rebuild mujoco_py.")
+            force_rebuild = True
 
+    from lockfile import LockFile
     lockpath = os.path.join('/mujoco_py_apptainer', 'mujocopy-buildlock')
-
-    mod = None
-    force_rebuild = os.environ.get('MUJOCO_PY_FORCE_REBUILD')
-    if force_rebuild:
-        os.makedirs(lockpath, exist_ok=True)
-        with LockFile(lockpath):
+    os.makedirs(lockpath, exist_ok=True)
+    with LockFile(lockpath):
+        if force_rebuild:
             # Try to remove the old file, ignore errors if it doesn't exist
             print("Removing old mujoco_py cext", cext_so_path)
             try:
                 os.remove(cext_so_path)
             except OSError:
                 pass
-    if exists(cext_so_path):
-        try:
-            mod = load_dynamic_ext('cymj', cext_so_path)
-        except ImportError:
-            print("Import error. Trying to rebuild mujoco_py.")
-    if mod is None:
-        with LockFile(lockpath):
-            cext_so_path = builder.build()
-            mod = load_dynamic_ext('cymj', cext_so_path)
-    return mod
+        elif exists(cext_so_path):
+            # Another process built it while we were waiting for the lock
+            return load_dynamic_ext('cymj', cext_so_path)
+        cext_so_path = builder.build()
+        return load_dynamic_ext('cymj', cext_so_path)
 
 
 def _ensure_set_env_var(var_name, lib_path):
     paths = os.environ.get(var_name, "").split(":")
+    # Usually the path is there verbatim, only normalize if it isn't
+    if lib_path in paths:
+        return
     paths = [os.path.abspath(path) for path in paths]
     if lib_path not in paths:
         raise Exception("\nMissing path to your environment variable. \n"
@@ -122,37 +223,160 @@ def _ensure_set_env_var(var_name, lib_path):
 
 def load_dynamic_ext(name, path):
     ''' Load compiled shared object and return as python module. '''
+    # Pass the loader explicitly, as our library suffixes aren't
+    # necessarily registered extension suffixes (e.g. .so on Windows).
     loader = ExtensionFileLoader(name, path)
-    return loader.load_module()
+    spec = importlib.util.spec_from_file_location(name, path, loader=loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        # Don't leave a half-initialised module behind, as load_module() did
+        sys.modules.pop(name, None)
+        raise
+    return module
 
 
-class custom_build_ext(build_ext):
+def get_custom_build_ext():
     """
     Custom build_ext to suppress the "-Wstrict-prototypes" warning.
     It arises from the fact that we're using C++. This seems to be
     the cleanest way to get rid of the extra flag.
 
     See http://stackoverflow.com/a/36293331/248400
+
+    The class is created on demand, so that Cython is only imported
+    when we actually need to build.
     """
+    from Cython.Distutils.old_build_ext import old_build_ext as build_ext
+
+    class custom_build_ext(build_ext):
+
+        def build_extensions(self):
+            customize_compiler(self.compiler)
+
+            try:
+                self.compiler.compiler_so.remove("-Wstrict-prototypes")
+            except (AttributeError, ValueError):
+                pass
+            build_ext.build_extensions(self)
 
-    def build_extensions(self):
-        customize_compiler(self.compiler)
+    return custom_build_ext
 
+
+def fix_shared_library(so_file, needed, rpath):
+    '''
+    Used to fixup shared libraries on Linux.
+
+    `needed` is a list of (name, library_path) pairs: any dependency on
+    `name` is dropped and `library_path` is added as a dependency instead.
+    The runpath is set to `rpath`.
+    All edits are made by a single patchelf invocation; --remove-needed is
+    a no-op for absent entries, so there is no need to probe with ldd.
+    '''
+    # Sets DT_RUNPATH, which is searched after LD_LIBRARY_PATH, so a
+    # library built elsewhere still prefers the user's MuJoCo.
+    args = ['patchelf', '--set-rpath', rpath]
+    for name, _ in needed:
+        args.extend(['--remove-needed', name])
+    for _, library_path in needed:
+        args.extend(['--add-needed', library_path])
+    subprocess.check_call(args + [so_file])
+
+
+def get_build_jobs():
+    '''
+    Number of compiler jobs to run in parallel when building the extension.
+    Defaults to the number of usable CPUs; set the MUJOCO_PY_BUILD_JOBS
+    environment variable to override, e.g. `MUJOCO_PY_BUILD_JOBS=1` to
+    compile serially.
+    '''
+    jobs = os.environ.get('MUJOCO_PY_BUILD_JOBS')
+    if jobs:
         try:
-            self.compiler.compiler_so.remove("-Wstrict-prototypes")
-        except (AttributeError, ValueError):
-            pass
-        build_ext.build_extensions(self)
+            return max(1, int(jobs))
+        except ValueError:
+            print("Ignoring MUJOCO_PY_BUILD_JOBS=%r, expected an integer. "
+                  "Using the number of CPUs instead." % jobs, file=sys.stderr)
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
 
 
-def fix_shared_library(so_file, name, library_path):
-    ''' Used to fixup shared libraries on Linux '''
-    subprocess.check_call(['patchelf', '--remove-rpath', so_file])
-    ldd_output = subprocess.check_output(['ldd', so_file]).decode('utf-8')
+class parallel_compile():
+    '''
+    Context manager which patches distutils' `CCompiler.compile` so that
+    the object files of an extension are compiled in a thread pool.
+    The compiler processes do the actual work, so threads are sufficient.
 
-    if name in ldd_output:
-        subprocess.check_call(['patchelf', '--remove-needed', name, so_file])
-    subprocess.check_call(['patchelf', '--add-needed', library_path, so_file])
+    See https://stackoverflow.com/a/13176803
+    '''
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def __enter__(self):
+        self.prev_compile = ccompiler.CCompiler.compile
+        if self.jobs > 1:
+            ccompiler.CCompiler.compile = self._make_compile(self.jobs)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        ccompiler.CCompiler.compile = self.prev_compile
+
+    @staticmethod
+    def _make_compile(jobs):
+        def compile(self, sources, output_dir=None, macros=None,
+                    include_dirs=None, debug=0, extra_preargs=None,
+                    extra_postargs=None, depends=None):
+            macros, objects, extra_postargs, pp_opts, build = \
+                self._setup_compile(output_dir, macros, include_dirs,
+                                    sources, depends, extra_postargs)
+            cc_args = self._get_cc_args(pp_opts, debug, extra_preargs)
+
+            def _single_compile(obj):
+                try:
+                    src, ext = build[obj]
+                except KeyError:
+                    return
+                self._compile(obj, src, ext, cc_args, extra_postargs, pp_opts)
+
+            with ThreadPool(min(jobs, max(1, len(objects)))) as pool:
+                list(pool.imap(_single_compile, objects))
+            return objects
+        return compile
+
+
+class use_ccache():
+    '''
+    Context manager which prefixes the C/C++ compilers with ccache, when it
+    is installed, so that rebuilding unchanged generated sources is nearly
+    free. Does nothing on Windows, where distutils ignores $CC.
+    '''
+
+    ENV_VARS = ('CC', 'CXX', 'CCACHE_COMPILERCHECK')
+
+    def __enter__(self):
+        self.prev_env = {var: os.environ.get(var) for var in self.ENV_VARS}
+        if sys.platform.startswith('win') or shutil.which('ccache') is None:
+            return self
+        for var, default in (('CC', 'gcc'), ('CXX', 'g++')):
+            compiler = (os.environ.get(var) or
+                        sysconfig.get_config_var(var) or default)
+            if not compiler.split()[0].endswith('ccache'):
+                os.environ[var] = 'ccache ' + compiler
+        # Hash the compiler binary rather than its mtime, so that
+        # reinstalling the same compiler doesn't invalidate the cache.
+        os.environ.setdefault('CCACHE_COMPILERCHECK', 'content')
+        return self
+
+    def __exit__(self, type, value, traceback):
+        for var, prev_value in self.prev_env.items():
+            if prev_value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = prev_value
 
 
 def manually_link_libraries(mujoco_path, raw_cext_dll_path):
@@ -175,21 +399,19 @@ def manually_link_libraries(mujoco_path, raw_cext_dll_path):
     # reference here
     from_mujoco_path = '@executable_path/libmujoco200.dylib'
     to_mujoco_path = '%s/libmujoco200.dylib' % mj_bin_path
+    from_glfw_path = 'libglfw.3.dylib'
+    to_glfw_path = os.path.join(mj_bin_path, 'libglfw.3.dylib')
+    # install_name_tool accepts several -change pairs in one invocation
     subprocess.check_call(['install_name_tool',
                            '-change',
                            from_mujoco_path,
                            to_mujoco_path,
-                           tmp_final_cext_dll_path])
-
-    from_glfw_path = 'libglfw.3.dylib'
-    to_glfw_path = os.path.join(mj_bin_path, 'libglfw.3.dylib')
-    subprocess.check_call(['install_name_tool',
                            '-change',
                            from_glfw_path,
                            to_glfw_path,
                            tmp_final_cext_dll_path])
 
-    os.rename(tmp_final_cext_dll_path, final_cext_dll_path)
+    os.replace(tmp_final_cext_dll_path, final_cext_dll_path)
     return final_cext_dll_path
 
 
@@ -199,57 +421,137 @@ class MujocoExtensionBuilder():
 
     def __init__(self, mujoco_path):
         self.mujoco_path = mujoco_path
-        python_version = str(sys.version_info.major) + str(sys.version_info.minor)
-        self.version = '%s_%s_%s' % (get_version(), python_version, self.build_base())
-        self.extension = Extension(
+        self.source_hash, self.version = self.get_cext_version(mujoco_path)
+        # Cython caches generated C sources here, keyed on the pyx/pxd
+        # contents. Set MUJOCO_PY_CYCACHE_DIR to use another location.
+        self.cython_cache_dir = os.environ.get(
+            'MUJOCO_PY_CYCACHE_DIR',
+            join(self.CYMJ_DIR_PATH, 'generated', '_cycache'))
+        # Only set up when building, so that locating an already built
+        # library stays cheap. See `_ensure_extension()`.
+        self.extension = None
+
+    def _ensure_extension(self):
+        if self.extension is None:
+            self.extension = self._make_extension()
+        return self.extension
+
+    def _make_extension(self):
+        ''' Returns the extension to build, subclasses add platform specifics. '''
+        import numpy as np
+        extension = Extension(
             'mujoco_py.cymj',
             sources=[join(self.CYMJ_DIR_PATH, "cymj.pyx")],
             include_dirs=[
                 self.CYMJ_DIR_PATH,
-                join(mujoco_path, 'include'),
+                join(self.mujoco_path, 'include'),
                 np.get_include(),
             ],
             libraries=['mujoco200'],
-            library_dirs=[join(mujoco_path, 'bin')],
+            library_dirs=[join(self.mujoco_path, 'bin')],
             extra_compile_args=[
-                '-fopenmp',  # needed for OpenMP
                 '-w',  # suppress numpy compilation warnings
             ],
-            extra_link_args=['-fopenmp'],
+            extra_link_args=[],
             language='c')
+        # Only link libgomp when it's actually used, as every extra
+        # dependency slows down loading the library.
+        if uses_openmp(self.CYMJ_DIR_PATH):
+            extension.extra_compile_args.append('-fopenmp')
+            extension.extra_link_args.append('-fopenmp')
+        return extension
 
     def build(self):
         built_so_file_path = self._build_impl()
         new_so_file_path = self.get_so_file_path()
-        move(built_so_file_path, new_so_file_path)
+        os.replace(built_so_file_path, new_so_file_path)
+        self._update_cache_manifest(new_so_file_path)
         return new_so_file_path
 
-    def build_base(self):
-        return self.__class__.__name__.lower()
+    def _update_cache_manifest(self, so_file_path):
+        '''
+        Records the built library in generated/cache_manifest.json, and
+        removes the libraries and build directories it supersedes: those
+        built from other sources by the same builder, interpreter and MuJoCo
+        install. Builds for other interpreters or installs sharing this tree
+        are left alone.
+        '''
+        manifest_path = join(self.CYMJ_DIR_PATH, 'generated', 'cache_manifest.json')
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        python_version = str(sys.version_info.major) + str(sys.version_info.minor)
+        for name, entry in list(manifest.items()):
+            if (entry.get('builder') == self.build_base() and
+                    entry.get('executable') == sys.executable and
+                    entry.get('mujoco_path') == self.mujoco_path and
+                    entry.get('hash') != self.source_hash):
+                try:
+                    os.remove(join(dirname(manifest_path), name))
+                except OSError:
+                    pass
+                if entry.get('build_dir'):
+                    shutil.rmtree(entry['build_dir'], ignore_errors=True)
+                del manifest[name]
+        manifest[os.path.basename(so_file_path)] = {
+            'hash': self.source_hash,
+            'builder': self.build_base(),
+            'python': python_version,
+            'executable': sys.executable,
+            'version': get_version(),
+            'mujoco_path': self.mujoco_path,
+            'build_dir': self._build_dir(),
+        }
+        tmp_manifest_path = manifest_path + '~'
+        with open(tmp_manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_manifest_path, manifest_path)
+
+    @classmethod
+    def build_base(cls):
+        return cls.__name__.lower()
+
+    @classmethod
+    def get_cext_version(cls, mujoco_path):
+        ''' Returns the source hash and the version string keying the library. '''
+        python_version = str(sys.version_info.major) + str(sys.version_info.minor)
+        source_hash = get_cext_hash(cls.CYMJ_DIR_PATH, mujoco_path, cls.build_base())
+        version = '%s_%s_%s_%s' % (get_version(), python_version,
+                                   cls.build_base(), source_hash)
+        return source_hash, version
 
     def _build_impl(self):
+        from Cython.Build import cythonize
         dist = Distribution({
             "script_name": None,
             "script_args": ["build_ext"]
         })
-        dist.ext_modules = cythonize([self.extension])
+        jobs = get_build_jobs()
+        os.makedirs(self.cython_cache_dir, exist_ok=True)
+        dist.ext_modules = cythonize([self._ensure_extension()], nthreads=jobs,
+                                     cache=self.cython_cache_dir)
         dist.include_dirs = []
-        dist.cmdclass = {'build_ext': custom_build_ext}
+        dist.cmdclass = {'build_ext': get_custom_build_ext()}
         build = dist.get_command_obj('build')
-        # following the convention of cython's pyxbuild and naming
-        # base directory "_pyxbld"
-        build.build_base = join(self.CYMJ_DIR_PATH, 'generated',
-                                '_pyxbld_%s' % (self.version))
+        build.build_base = self._build_dir()
         dist.parse_command_line()
         obj_build_ext = dist.get_command_obj("build_ext")
-        dist.run_commands()
+        with parallel_compile(jobs), use_ccache():
+            dist.run_commands()
         built_so_file_path, = obj_build_ext.get_outputs()
         return built_so_file_path
 
+    def _build_dir(self):
+        # following the convention of cython's pyxbuild and naming
+        # base directory "_pyxbld"
+        return join(self.CYMJ_DIR_PATH, 'generated', '_pyxbld_%s' % (self.version))
+
     def get_so_file_path(self):
-        dir_path = abspath(dirname(__file__))
         python_version = str(sys.version_info.major) + str(sys.version_info.minor)
-        return join(dir_path, "generated", "cymj_{}_{}.so".format(self.version, python_version))
+        return join(self.CYMJ_DIR_PATH, "generated",
+                    "cymj_{}_{}.so".format(self.version, python_version))
 
 
 class WindowsExtensionBuilder(MujocoExtensionBuilder):
@@ -257,55 +559,63 @@ class WindowsExtensionBuilder(MujocoExtensionBuilder):
     def __init__(self, mujoco_path):
         super().__init__(mujoco_path)
         os.environ["PATH"] += ";" + join(mujoco_path, "bin")
-        self.extension.sources.append(self.CYMJ_DIR_PATH + "/gl/dummyshim.c")
 
+    def _make_extension(self):
+        extension = super()._make_extension()
+        extension.sources.append(self.CYMJ_DIR_PATH + "/gl/dummyshim.c")
+        return extension
 
-class LinuxCPUExtensionBuilder(MujocoExtensionBuilder):
 
-    def __init__(self, mujoco_path):
-        super().__init__(mujoco_path)
+class LinuxCPUExtensionBuilder(MujocoExtensionBuilder):
 
-        self.extension.sources.append(
+    def _make_extension(self):
+        extension = super()._make_extension()
+        extension.sources.append(
             join(self.CYMJ_DIR_PATH, "gl", "osmesashim.c"))
-        self.extension.libraries.extend(['glewosmesa', 'OSMesa', 'GL'])
-        self.extension.runtime_library_dirs = [join(mujoco_path, 'bin')]
+        extension.libraries.extend(['glewosmesa', 'OSMesa', 'GL'])
+        return extension
 
     def _build_impl(self):
         so_file_path = super()._build_impl()
-        # Removes absolute paths to libraries. Allows for dynamic loading.
-        fix_shared_library(so_file_path, 'libmujoco200.so', 'libmujoco200.so')
-        fix_shared_library(so_file_path, 'libglewosmesa.so', 'libglewosmesa.so')
+        # Replaces absolute paths to libraries with their names, so they're
+        # looked up through LD_LIBRARY_PATH. MuJoCo's bin directory is only
+        # added as a runpath fallback, searched after LD_LIBRARY_PATH.
+        fix_shared_library(so_file_path, [
+            ('libmujoco200.so', 'libmujoco200.so'),
+            ('libglewosmesa.so', 'libglewosmesa.so'),
+        ], rpath=join(self.mujoco_path, 'bin'))
         return so_file_path
 
 
 class LinuxGPUExtensionBuilder(MujocoExtensionBuilder):
 
-    def __init__(self, mujoco_path):
-        super().__init__(mujoco_path)
-
-        self.extension.sources.append(self.CYMJ_DIR_PATH + "/gl/eglshim.c")
-        self.extension.include_dirs.append(self.CYMJ_DIR_PATH + '/vendor/egl')
-        self.extension.libraries.extend(['glewegl'])
-        self.extension.runtime_library_dirs = [join(mujoco_path, 'bin')]
+    def _make_extension(self):
+        extension = super()._make_extension()
+        extension.sources.append(self.CYMJ_DIR_PATH + "/gl/eglshim.c")
+        extension.include_dirs.append(self.CYMJ_DIR_PATH + '/vendor/egl')
+        extension.libraries.extend(['glewegl'])
+        return extension
 
     def _build_impl(self):
         so_file_path = super()._build_impl()
-        fix_shared_library(so_file_path, 'libOpenGL.so', 'libOpenGL.so.0')
-        fix_shared_library(so_file_path, 'libEGL.so', 'libEGL.so.1')
-        fix_shared_library(so_file_path, 'libmujoco200.so', 'libmujoco200.so')
-        fix_shared_library(so_file_path, 'libglewegl.so', 'libglewegl.so')
+        fix_shared_library(so_file_path, [
+            ('libOpenGL.so', 'libOpenGL.so.0'),
+            ('libEGL.so', 'libEGL.so.1'),
+            ('libmujoco200.so', 'libmujoco200.so'),
+            ('libglewegl.so', 'libglewegl.so'),
+        ], rpath=join(self.mujoco_path, 'bin'))
         return so_file_path
 
 
 class MacExtensionBuilder(MujocoExtensionBuilder):
 
-    def __init__(self, mujoco_path):
-        super().__init__(mujoco_path)
-
-        self.extension.sources.append(self.CYMJ_DIR_PATH + "/gl/dummyshim.c")
-        self.extension.libraries.extend(['glfw.3'])
-        self.extension.define_macros = [('ONMAC', None)]
-        self.extension.runtime_library_dirs = [join(mujoco_path, 'bin')]
+    def _make_extension(self):
+        extension = super()._make_extension()
+        extension.sources.append(self.CYMJ_DIR_PATH + "/gl/dummyshim.c")
+        extension.libraries.extend(['glfw.3'])
+        extension.define_macros = [('ONMAC', None)]
+        extension.runtime_library_dirs = [join(self.mujoco_path, 'bin')]
+        return extension
 
     def _build_impl(self):
         if not os.environ.get('CC'):
@@ -340,6 +650,17 @@ class MujocoException(Exception):
     pass
 
 
+# Known MuJoCo warnings, and the fix we suggest for each
+_KNOWN_WARNINGS = {
+    'Pre-allocated constraint buffer is full': 'Increase njmax in mujoco XML',
+    'Pre-allocated contact buffer is full': 'Increase njconmax in mujoco XML',
+    # This unhelpfully-named warning is what you get if you feed MuJoCo NaNs
+    'Unknown warning type': 'Check for NaN in simulation.',
+}
+# Matches any of the known warnings in a single pass
+_KNOWN_WARNINGS_RE = re.compile('|'.join(map(re.escape, _KNOWN_WARNINGS)))
+
+
 def user_warning_raise_exception(warn_bytes):
     '''
     User-defined warning callback, which is called by mujoco on warnings.
@@ -351,13 +672,9 @@ def user_warning_raise_exception(warn_bytes):
     # TODO: look through test output to see MuJoCo warnings to catch
     # and recommend. Also fix those tests
     warn = warn_bytes.decode()  # Convert bytes to string
-    if 'Pre-allocated constraint buffer is full' in warn:
-        raise MujocoException(warn + 'Increase njmax in mujoco XML')
-    if 'Pre-allocated contact buffer is full' in warn:
-        raise MujocoException(warn + 'Increase njconmax in mujoco XML')
-    # This unhelpfully-named warning is what you get if you feed MuJoCo NaNs
-    if 'Unknown warning type' in warn:
-        raise MujocoException(warn + 'Check for NaN in simulation.')
+    match = _KNOWN_WARNINGS_RE.search(warn)
+    if match:
+        raise MujocoException(warn + _KNOWN_WARNINGS[match.group(0)])
     raise MujocoException('Got MuJoCo Warning: {}'.format(warn))
 
 
@@ -380,18 +697,36 @@ class ignore_mujoco_warnings:
         cymj.set_warning_callback(self.prev_user_warning)
 
 
-def build_fn_cleanup(name):
+def get_fn_cache_dir():
     '''
-    Cleanup files generated by building callback.
+    Directory where compiled callbacks are cached, or None if it can't be
+    written to (e.g. a read-only home), in which case callbacks aren't cached.
+    Set the MUJOCO_PY_FN_CACHE_DIR environment variable to override the
+    default of ~/.cache/mujoco_py/fn_cache. Nothing is ever removed from it,
+    delete the directory to reclaim space.
+    '''
+    cache_dir = os.environ.get('MUJOCO_PY_FN_CACHE_DIR')
+    if not cache_dir:
+        cache_home = (os.environ.get('XDG_CACHE_HOME') or
+                      join(expanduser('~'), '.cache'))
+        cache_dir = join(cache_home, 'mujoco_py', 'fn_cache')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return None
+    if not os.access(cache_dir, os.W_OK):
+        return None
+    return cache_dir
+
+
+def build_fn_cleanup(build_dir):
+    '''
+    Cleanup files generated by building callback, i.e. its private build
+    directory.
     Set the MUJOCO_PY_DEBUG_FN_BUILDER environment variable to disable cleanup.
     '''
     if not os.environ.get('MUJOCO_PY_DEBUG_FN_BUILDER', False):
-        for f in glob.glob(name + '*'):
-            try:
-                os.remove(f)
-            except PermissionError as e:
-                # This happens trying to remove libraries on appveyor
-                print('Error removing {}, continuing anyway: {}'.format(f, e))
+        shutil.rmtree(build_dir, ignore_errors=True)
 
 
 def build_callback_fn(function_string, userdata_names=[]):
@@ -450,9 +785,14 @@ def build_callback_fn(function_string, userdata_names=[]):
         ```
     Note these are just C `#define`s and are limited in how they can be used.
 
-    After compilation, the built library containing the function is loaded
-    into memory and all of the files (including the library) are deleted.
-    To retain these for debugging set the `MUJOCO_PY_DEBUG_FN_BUILDER` envvar.
+    After compilation, the built library containing the function is cached
+    in `~/.cache/mujoco_py/fn_cache` (see `get_fn_cache_dir()`), keyed on a
+    hash of the generated source, and the intermediate build files are
+    deleted. Building the same function again, in this or any later process,
+    loads the cached library instead. If the cache directory isn't writable
+    the library is built in a temporary directory and deleted after loading.
+    To retain the build files for debugging set the
+    `MUJOCO_PY_DEBUG_FN_BUILDER` envvar.
 
     To save time compiling, these function pointers may be re-used by many
     different consumers.  They are thread-safe and don't acquire the GIL.
@@ -462,38 +802,59 @@ def build_callback_fn(function_string, userdata_names=[]):
     '''
     assert isinstance(userdata_names, (list, tuple)), \
         'invalid userdata_names: {}'.format(userdata_names)
-    ffibuilder = FFI()
-    ffibuilder.cdef('extern uintptr_t __fun;')
-    name = '_fn_' + ''.join(choice(ascii_lowercase) for _ in range(15))
-    source_string = '#include <mujoco.h>\n'
+    return _build_callback_fn(function_string, tuple(userdata_names))
+
+
+@functools.lru_cache(maxsize=None)
+def _build_callback_fn(function_string, userdata_names):
+    import cffi
+    source_lines = ['#include <mujoco.h>']
     # Add defines for each userdata to make setting them easier
-    for i, data_name in enumerate(userdata_names):
-        source_string += '#define {} d->userdata[{}]\n'.format(data_name, i)
-    source_string += function_string
-    source_string += '\nuintptr_t __fun = (uintptr_t) fun;'
+    source_lines.extend('#define {} d->userdata[{}]'.format(data_name, i)
+                        for i, data_name in enumerate(userdata_names))
+    source_lines.append(function_string)
+    source_lines.append('uintptr_t __fun = (uintptr_t) fun;')
+    source_string = '\n'.join(source_lines)
+    key = hashlib.sha256((source_string + mujoco_path + cffi.__version__).encode())
+    name = '_fn_' + key.hexdigest()[:16]
+    cache_dir = get_fn_cache_dir()
+    if cache_dir is not None:
+        cached_library_path = join(cache_dir,
+                                   name + sysconfig.get_config_var('EXT_SUFFIX'))
+        if exists(cached_library_path):
+            return load_dynamic_ext(name, cached_library_path).lib.__fun
+
+    ffibuilder = cffi.FFI()
+    ffibuilder.cdef('extern uintptr_t __fun;')
     # Link against mujoco so we can call mujoco functions from within callback
     ffibuilder.set_source(name, source_string,
                           include_dirs=[join(mujoco_path, 'include')],
                           library_dirs=[join(mujoco_path, 'bin')],
                           libraries=['mujoco200'])
+    # Build in a private directory, so that processes compiling the same
+    # function concurrently don't clobber each other's files. Within the
+    # cache directory, so the library can be moved there atomically.
+    build_dir = tempfile.mkdtemp(prefix=name + '_', dir=cache_dir)
     # Catch compilation exceptions so we can cleanup partial files in that case
     try:
-        library_path = ffibuilder.compile(verbose=True)
+        library_path = ffibuilder.compile(tmpdir=build_dir, verbose=True)
     except Exception as e:
-        build_fn_cleanup(name)
+        build_fn_cleanup(build_dir)
         raise e
     # On Mac the MuJoCo library is linked strangely, so we have to fix it here
     if sys.platform == 'darwin':
         fixed_library_path = manually_link_libraries(mujoco_path, library_path)
-        move(fixed_library_path, library_path)  # Overwrite with fixed library
+        os.replace(fixed_library_path, library_path)  # Overwrite with fixed library
+    if cache_dir is not None:
+        cached_library_path = join(cache_dir, os.path.basename(library_path))
+        os.replace(library_path, cached_library_path)
+        library_path = cached_library_path
+    # Once loaded into memory, the library in build_dir can be deleted
     module = load_dynamic_ext(name, library_path)
-    # Now that the module is loaded into memory, we can actually delete it
-    build_fn_cleanup(name)
+    build_fn_cleanup(build_dir)
     return module.lib.__fun
 
 
-
-
 def find_key():
     ''' Try to find the key file, if missing, print out a big message '''
     if exists(key_path):
@@ -515,9 +876,9 @@ class dict2(object):
 
 
 functions = dict2()
-for func_name in dir(cymj):
-    if func_name.startswith("_mj"):
-        setattr(functions, func_name[1:], getattr(cymj, func_name))
+functions.__dict__.update({func_name[1:]: func
+                           for func_name, func in vars(cymj).items()
+                           if func_name.startswith("_mj")})
 
 # Set user-defined callbacks that raise assertion with message
 cymj.set_warning_callback(user_warning_raise_exception)
@@ -1,7 +1,13 @@
 #!/usr/bin/env python
+import os
+import tempfile
 import unittest
+from unittest import mock
+
+import cffi
 import numpy as np
 from mujoco_py import load_model_from_xml, MjSim, functions
+from mujoco_py.builder import build_callback_fn, _build_callback_fn
 
 
 XML = '''
@@ -151,6 +157,33 @@ class TestSubstep(unittest.TestCase):
         functions.mju_quat2Mat(mat, sim.data.body_xquat[2])
         np.testing.assert_array_equal(sim.data.userdata, mat)
 
+    def test_build_cache(self):
+        ''' Test that identical callbacks are only compiled once '''
+        fn = '''
+            void fun(const mjModel* m, mjData* d) {
+                cached_sum += 1;
+            }
+        '''
+        with tempfile.TemporaryDirectory() as cache_dir, \
+                mock.patch.dict(os.environ, {'MUJOCO_PY_FN_CACHE_DIR': cache_dir}):
+            # Skip the in-process memo, so builds go through the cache dir
+            _build_callback_fn.cache_clear()
+            ptr = build_callback_fn(fn, ['cached_sum'])
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            _build_callback_fn.cache_clear()
+            with mock.patch.object(cffi.FFI, 'compile',
+                                   side_effect=AssertionError('recompiled')):
+                self.assertEqual(build_callback_fn(fn, ['cached_sum']), ptr)
+                self.assertEqual(build_callback_fn(fn, ('cached_sum',)), ptr)
+            # Different userdata names generate a different source and module
+            other_ptr = build_callback_fn(fn, ['other', 'cached_sum'])
+            self.assertNotEqual(other_ptr, ptr)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+            _build_callback_fn.cache_clear()
+        sim = MjSim(load_model_from_xml(XML.format(nuserdata=2)),
+                    substep_callback=other_ptr)
+        sim.step()
+        self.assertEqual(sim.data.userdata[1], 1)
 
 if __name__ == '__main__':
     unittest.main()
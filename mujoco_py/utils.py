@@ -1,6 +1,7 @@
 import sys
 import os
 import copy
+import functools
 from os.path import join, expanduser, exists
 
 import numpy as np
@@ -78,10 +79,16 @@ def discover_mujoco():
     - mujoco_path (str): Path to MuJoCo 2.0 directory.
     - key_path (str): Path to the MuJoCo license key.
     """
-    key_path = os.getenv('MUJOCO_PY_MJKEY_PATH')
+    return _discover_mujoco(os.getenv('MUJOCO_PY_MJKEY_PATH'),
+                            os.getenv('MUJOCO_PY_MUJOCO_PATH'))
+
+
+@functools.lru_cache(maxsize=None)
+def _discover_mujoco(key_path, mujoco_path):
+    # Memoized on the environment variables, as this runs several times
+    # while importing mujoco_py. Failures raise, so they aren't cached.
     if not key_path:
         key_path = join(expanduser('~'), '.mujoco', 'mjkey.txt')
-    mujoco_path = os.getenv('MUJOCO_PY_MUJOCO_PATH')
     if not mujoco_path:
         mujoco_path = join(expanduser('~'), '.mujoco', 'mujoco200')
 